@@ -3,74 +3,186 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import re
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.cluster import KMeans
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.cluster import MiniBatchKMeans
 from rake_nltk import Rake
 from keybert import KeyBERT
 from wordcloud import WordCloud
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 import nltk
 import yake
+import xlsxwriter
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 nltk.download('stopwords')
+# rake_nltk splits sentences with nltk.sent_tokenize, which needs the punkt models
 nltk.download('punkt')
+nltk.download('punkt_tab')
+
+_STOP = frozenset(stopwords.words('english'))
+_STOP_LIST = sorted(_STOP)  # sklearn vectorizers only accept a list
+_TOKEN_PATTERN = r'(?u)\b[a-zA-Z0-9]{2,}\b'  # 2+ chars, like CountVectorizer's default
+# Every character str.isspace() accepts, spelled out so the class means the same to Python's
+# re and to pyarrow's RE2 (whose \s is ASCII-only)
+_WHITESPACE = ''.join(chr(c) for c in range(0x3001) if chr(c).isspace())
+_NONALNUM = '[^a-zA-Z0-9' + _WHITESPACE + ']'
+_NON_ASCII_WHITESPACE = re.compile('[' + ''.join(c for c in _WHITESPACE if not c.isascii()) + ']')
+_NUMBA_MIN_ROWS = 100_000  # below this the JIT compile isn't paid back
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _clean_ascii(buf):
+        # Lowercase letters, keep digits, map whitespace to a space and drop everything else (0)
+        out = np.empty_like(buf)
+        for k in prange(buf.size):
+            c = buf[k]
+            if 65 <= c <= 90:
+                out[k] = c + 32
+            elif 97 <= c <= 122 or 48 <= c <= 57:
+                out[k] = c
+            elif c == 32 or 9 <= c <= 13 or 28 <= c <= 31:
+                out[k] = 32
+            else:
+                out[k] = 0
+        return out
+
+def _clean_with_numba(texts):
+    # Clean the whole corpus as one byte buffer, with a newline between rows. Non-ASCII rows
+    # are lowercased and have Unicode whitespace turned into spaces first, so the result
+    # matches the regex path once the remaining non-ASCII characters are dropped.
+    encoded = [text.encode('ascii') if text.isascii()
+               else _NON_ASCII_WHITESPACE.sub(' ', text.lower()).encode('ascii', errors='ignore')
+               for text in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    buf = np.frombuffer(b'\n'.join(encoded), dtype=np.uint8)
+    del encoded  # release each full-corpus copy as soon as the next one exists
+    out = _clean_ascii(buf)
+    del buf
+    out[np.cumsum(lengths + 1)[:-1] - 1] = 10
+    out = out[out != 0]
+    rows = str(out, 'ascii').split('\n')
+    return pd.Series(rows, index=texts.index)
 
 # Preprocessing Functions
-def preprocess_text(text):
-    text = text.lower()
-    text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
-    tokens = word_tokenize(text)
-    tokens = [word for word in tokens if word not in stopwords.words('english')]
-    return ' '.join(tokens)
+def preprocess_text(texts):
+    # Vectorized over the whole Series: the regex has already stripped punctuation,
+    # so a whitespace split is equivalent to word_tokenize here.
+    if njit is not None and len(texts) >= _NUMBA_MIN_ROWS:
+        s = _clean_with_numba(texts)
+    else:
+        s = texts.str.lower()
+        s = s.str.replace(_NONALNUM, '', regex=True)
+    return s.str.split().map(lambda toks: ' '.join(t for t in toks if t not in _STOP))
 
 # Deduplication Function
 def deduplicate_phrases(phrases):
-    return list(set(phrases))
+    # pd.unique keeps first-seen order, unlike set()
+    return pd.unique(np.asarray(phrases, dtype=object))
 
 # Frequency Analysis
-def perform_frequency_analysis(data, ngram_range=(1, 3)):
-    vectorizer = CountVectorizer(ngram_range=ngram_range)
+def perform_frequency_analysis(data, ngram_range=(1, 3), top_k=1000):
+    # Lowercasing and stopword removal happen inside the vectorizer, so raw text can be passed in
+    vectorizer = CountVectorizer(lowercase=True, stop_words=_STOP_LIST, token_pattern=_TOKEN_PATTERN,
+                                 ngram_range=ngram_range, dtype=np.int32)
     X = vectorizer.fit_transform(data)
-    freqs = zip(vectorizer.get_feature_names_out(), X.sum(axis=0).tolist()[0])
-    sorted_freqs = sorted(freqs, key=lambda x: x[1], reverse=True)
-    return pd.DataFrame(sorted_freqs, columns=['Phrase', 'Frequency'])
+    # Column sums straight off the sparse matrix; partition out the top_k in O(V), then sort only those
+    sums = np.asarray(X.sum(axis=0)).ravel()
+    if sums.size > top_k:
+        # Take everything above the k-th largest count, then fill up with the earliest ties, so
+        # the survivors are the same as after a full stable sort
+        cutoff = np.partition(sums, sums.size - top_k)[sums.size - top_k]
+        above = np.flatnonzero(sums > cutoff)
+        tied = np.flatnonzero(sums == cutoff)[:top_k - above.size]
+        top_idx = np.union1d(above, tied)  # sorted, so the stable sort below keeps vocabulary order
+    else:
+        top_idx = np.arange(sums.size)
+    top_idx = top_idx[np.argsort(-sums[top_idx], kind='stable')]
+    names = vectorizer.get_feature_names_out()[top_idx]
+    return pd.DataFrame({'Phrase': names, 'Frequency': sums[top_idx]})
 
 # Keyphrase Extraction
-def perform_keyphrase_extraction(data, method='yake', ngram_range=(1, 3)):
+# Streamlit re-executes this script on every interaction, so a plain lru_cache would be
+# rebuilt each rerun; st.cache_resource keeps one instance per process across reruns
+@st.cache_resource
+def _get_keybert():
+    return KeyBERT()
+
+def _extract_chunk(texts, method, ngram_range):
+    # Rake keeps state between calls and joblib may run this in the session's own thread, so
+    # build the (cheap) extractors per chunk rather than caching them across sessions
     phrases = []
     if method == 'yake':
         kw_extractor = yake.KeywordExtractor(n=ngram_range[1])
-        for text in data:
+        for text in texts:
             keywords = kw_extractor.extract_keywords(text)
             phrases.extend([kw[0] for kw in keywords])
     elif method == 'rake':
         rake = Rake()
-        for text in data:
+        for text in texts:
             rake.extract_keywords_from_text(text)
             phrases.extend(rake.get_ranked_phrases())
-    elif method == 'keybert':
-        kw_model = KeyBERT()
-        for text in data:
-            keywords = kw_model.extract_keywords(text, stop_words='english', top_n=5)
+    return phrases
+
+def perform_keyphrase_extraction(data, method='yake', ngram_range=(1, 3), n_jobs=-1):
+    texts = list(data)
+    phrases = []
+    if not texts:
+        return pd.DataFrame({'Phrase': deduplicate_phrases(phrases)})
+    if method == 'keybert':
+        # One batched call lets the transformer encode all documents together
+        kw_model = _get_keybert()
+        results = kw_model.extract_keywords(texts, stop_words='english', top_n=5)
+        if len(texts) == 1:
+            results = [results]
+        for keywords in results:
             phrases.extend([kw[0] for kw in keywords])
-    return pd.DataFrame(deduplicate_phrases(phrases), columns=['Phrase'])
+    elif method in ('yake', 'rake'):
+        n_chunks = min(effective_n_jobs(n_jobs), len(texts))
+        chunks = np.array_split(np.asarray(texts, dtype=object), n_chunks)
+        results = Parallel(n_jobs=n_jobs, batch_size='auto')(
+            delayed(_extract_chunk)(chunk.tolist(), method, ngram_range) for chunk in chunks
+        )
+        for chunk_phrases in results:
+            phrases.extend(chunk_phrases)
+    return pd.DataFrame({'Phrase': deduplicate_phrases(phrases)})
 
 # Clustering
 def perform_clustering(data, n_clusters=5):
-    vectorizer = CountVectorizer()
+    vectorizer = TfidfVectorizer(lowercase=True, stop_words=_STOP_LIST, token_pattern=_TOKEN_PATTERN,
+                                 max_features=50000, ngram_range=(1, 2))
     X = vectorizer.fit_transform(data)
-    model = KMeans(n_clusters=n_clusters)
+    model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=min(4096, X.shape[0]), random_state=0, n_init=3)
     model.fit(X)
-    phrases = [vectorizer.get_feature_names_out()[i] for i in model.cluster_centers_.argsort()[:, -1]]
-    return pd.DataFrame(deduplicate_phrases(phrases), columns=['Phrase'])
+    # Top term per cluster centroid
+    phrases = vectorizer.get_feature_names_out()[np.argmax(model.cluster_centers_, axis=1)]
+    return pd.DataFrame({'Phrase': deduplicate_phrases(phrases)})
 
 # Generate Phrase Cloud
-def generate_phrase_cloud(phrases):
-    text = ' '.join(phrases)
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text)
-    return wordcloud
+def _make_wordcloud():
+    # Horizontal-only layout with rank-based sizing skips the per-word orientation search
+    return WordCloud(width=800, height=400, background_color='white',
+                     prefer_horizontal=1.0, relative_scaling=0, max_words=100)
+
+def generate_phrase_cloud(wordcloud, frequencies):
+    # Phrases are already counted, so skip WordCloud's own tokenizing and counting.
+    # The instance keeps its layout between calls, so render to an array before the next one.
+    return wordcloud.generate_from_frequencies(frequencies).to_array()
+
+# Excel Output
+def write_sheet(workbook, df, sheet_name):
+    # constant_memory flushes each row once the next one starts, so write strictly row by row;
+    # DataFrame.to_excel emits cells column by column and would lose data in this mode
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, df.columns)
+    for row_idx, row in enumerate(df.itertuples(index=False), start=1):
+        worksheet.write_row(row_idx, 0, row)
 
 # Streamlit App
 st.title("Advanced Text Analysis with Progress Tracking")
@@ -79,46 +191,62 @@ uploaded_file = st.file_uploader("Upload your file (CSV or Excel)", type=["csv",
 
 if uploaded_file:
     st.write("Data preview:")
-    data = pd.read_csv(uploaded_file) if uploaded_file.name.endswith('.csv') else pd.read_excel(uploaded_file)
+    # Only LL_TEXT is analysed, so skip parsing the other columns
+    if uploaded_file.name.endswith('.csv'):
+        try:
+            data = pd.read_csv(uploaded_file, usecols=['LL_TEXT'], engine='pyarrow', dtype_backend='pyarrow')
+        except (ImportError, ValueError):
+            # pyarrow rejects line breaks inside quoted cells with a ParserError, a ValueError
+            uploaded_file.seek(0)
+            data = pd.read_csv(uploaded_file, usecols=['LL_TEXT'])
+    else:
+        try:
+            data = pd.read_excel(uploaded_file, usecols=['LL_TEXT'], engine='calamine')
+        except (ImportError, ValueError):
+            # pandas before 2.2 has no calamine engine and raises ValueError
+            uploaded_file.seek(0)
+            data = pd.read_excel(uploaded_file, usecols=['LL_TEXT'])
     st.dataframe(data.head())
 
     # Button to Start Analysis
     if st.button("Run Analysis"):
         with st.spinner("Processing..."):
-            # Preprocess and deduplicate
-            data['Processed_Text'] = data['LL_TEXT'].apply(preprocess_text)
-            data_dedup = data.drop_duplicates(subset=['Processed_Text'])
+            # Deduplicate ignoring case; the vectorizers tokenize and drop stopwords themselves
+            data_dedup = data[~data['LL_TEXT'].str.lower().duplicated()]
             
             # Frequency Analysis
-            freq_df = perform_frequency_analysis(data_dedup['Processed_Text'])
+            freq_df = perform_frequency_analysis(data_dedup['LL_TEXT'])
             st.subheader("Frequency Analysis")
             st.dataframe(freq_df.head(10))
             
             # Keyphrase Extraction
-            keyphrase_df = perform_keyphrase_extraction(data_dedup['Processed_Text'])
+            keyphrase_df = perform_keyphrase_extraction(preprocess_text(data_dedup['LL_TEXT']))
             st.subheader("Keyphrase Extraction")
             st.dataframe(keyphrase_df.head(10))
             
             # Clustering
-            cluster_df = perform_clustering(data_dedup['Processed_Text'])
+            cluster_df = perform_clustering(data_dedup['LL_TEXT'])
             st.subheader("Clustering")
             st.dataframe(cluster_df.head(10))
 
             # Phrase Clouds
-            freq_cloud = generate_phrase_cloud(freq_df['Phrase'].tolist()[:100])
-            keyphrase_cloud = generate_phrase_cloud(keyphrase_df['Phrase'].tolist()[:100])
-            cluster_cloud = generate_phrase_cloud(cluster_df['Phrase'].tolist()[:100])
+            freq_dict = dict(zip(freq_df['Phrase'].head(100), freq_df['Frequency'].head(100)))
+            # One instance per run; WordCloud is stateful, so it must not be shared across sessions
+            wordcloud = _make_wordcloud()
+            freq_cloud = generate_phrase_cloud(wordcloud, freq_dict)
+            # Keyphrases and cluster terms carry no counts, so weight them uniformly
+            keyphrase_cloud = generate_phrase_cloud(wordcloud, {p: 1 for p in keyphrase_df['Phrase'].head(100)})
+            cluster_cloud = generate_phrase_cloud(wordcloud, {p: 1 for p in cluster_df['Phrase'].head(100)})
 
-            st.image(freq_cloud.to_array(), caption="Frequency Phrase Cloud")
-            st.image(keyphrase_cloud.to_array(), caption="Keyphrase Extraction Phrase Cloud")
-            st.image(cluster_cloud.to_array(), caption="Clustering Phrase Cloud")
+            st.image([freq_cloud, keyphrase_cloud, cluster_cloud],
+                     caption=["Frequency Phrase Cloud", "Keyphrase Extraction Phrase Cloud", "Clustering Phrase Cloud"])
 
             # Save output
             output_file = "/mnt/data/analysis_output.xlsx"
-            with pd.ExcelWriter(output_file) as writer:
-                freq_df.to_excel(writer, sheet_name='Frequency Analysis', index=False)
-                keyphrase_df.to_excel(writer, sheet_name='Keyphrase Extraction', index=False)
-                cluster_df.to_excel(writer, sheet_name='Clustering', index=False)
+            with xlsxwriter.Workbook(output_file, {'constant_memory': True}) as workbook:
+                write_sheet(workbook, freq_df, 'Frequency Analysis')
+                write_sheet(workbook, keyphrase_df, 'Keyphrase Extraction')
+                write_sheet(workbook, cluster_df, 'Clustering')
 
             st.success("Analysis completed successfully!")
             st.markdown(f"[Download the output file](sandbox:/mnt/data/analysis_output.xlsx)")
@@ -1,17 +1,39 @@
+import codecs
+import csv
+import io
+import mmap
 import os
 import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Precompiled validation patterns, bound to .match so they can be used as checks directly
+_FILENAME = re.compile(r'^[\w\-]+\.txt$').match
+_ALNUM = re.compile(r'^[a-zA-Z0-9\-]+$').match
+_TXT = re.compile(r'^[\w\s\-]+$').match
+# One line with its terminator, ending at \r\n, \r or \n like a file opened in text mode
+_LINE = re.compile(rb'[^\r\n]*(?:\r\n?|\n)|[^\r\n]+')
 
 def validate_filename(filename):
     """Validate the filename based on expected naming conventions."""
-    if not re.match(r'^[\w\-]+\.txt$', filename):
+    if not _FILENAME(filename):
         return f"Filename '{filename}' does not match the expected pattern."
     return None
 
-def validate_encoding(filename, expected_encoding='utf-8'):
-    """Validate that the file is encoded in the expected format."""
+def validate_encoding(filename, expected_encoding='utf-8', chunk_size=1 << 20):
+    """Validate that the file is encoded in the expected format.
+
+    The file is decoded in fixed-size chunks and the decoded text is discarded, so
+    memory use does not grow with the file.
+    """
+    decoder = codecs.getincrementaldecoder(expected_encoding)()
     try:
-        with open(filename, 'r', encoding=expected_encoding) as file:
-            file.read()  # Try reading the file to check encoding
+        with open(filename, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)  # a truncated multi-byte sequence at EOF
     except UnicodeDecodeError:
         return f"File '{filename}' is not encoded in {expected_encoding}."
     return None
@@ -19,81 +41,269 @@ def validate_encoding(filename, expected_encoding='utf-8'):
 def convert_to_utf8(filename, new_filename):
     """Convert the file encoding to UTF-8 if it's not already."""
     try:
-        with open(filename, 'r', encoding='ISO-8859-1') as file:
-            content = file.read()
-        with open(new_filename, 'w', encoding='utf-8') as file:
-            file.write(content)
+        with open(filename, 'r', encoding='ISO-8859-1') as src, open(new_filename, 'w', encoding='utf-8') as dst:
+            shutil.copyfileobj(src, dst)  # copied in chunks rather than read whole
     except (UnicodeDecodeError, IOError) as e:
         raise RuntimeError(f"Failed to convert file encoding: {e}")
 
+def validate_and_convert_encoding(filename, new_filename, expected_encoding='utf-8'):
+    """Validate the file encoding and convert it to UTF-8 if needed.
+
+    A file that decodes is read once, in chunks, and never copied. A file that does not
+    is read up to its first undecodable chunk and then read again in full to convert it.
+    Returns the list of encoding errors and the name of the file to run the remaining
+    validations on, which is None if the conversion failed.
+    """
+    encoding_error = validate_encoding(filename, expected_encoding)
+    if encoding_error is None:
+        return [], filename
+    try:
+        convert_to_utf8(filename, new_filename)
+    except RuntimeError as e:
+        return [encoding_error, str(e)], None
+    return [encoding_error], new_filename
+
+def _utf8_length(field):
+    """Return the UTF-8 byte length of a field, skipping the encode for ASCII text."""
+    return len(field) if field.isascii() else len(field.encode('utf-8'))
+
+def _exceeds_utf8_length(column, max_length):
+    """Return a boolean array marking values whose UTF-8 byte length exceeds max_length."""
+    lengths = column.str.len().to_numpy(dtype=np.int64, copy=True)
+    # A UTF-8 character is at most 4 bytes, so only these rows can tip over on byte count
+    maybe = (lengths <= max_length) & (lengths * 4 > max_length)
+    if maybe.any():
+        lengths[maybe] = column[maybe].map(_utf8_length).to_numpy()
+    return lengths > max_length
+
+# The ASCII characters str.isspace() accepts; bytes.strip() alone skips \x1c-\x1f
+_ASCII_WHITESPACE = bytes(c for c in range(128) if chr(c).isspace())
+
+def _strip(data):
+    """Strip whitespace from bytes exactly as str.strip() would from the decoded text."""
+    if data.isascii():
+        return data.strip(_ASCII_WHITESPACE)
+    return data.decode('utf-8').strip().encode('utf-8')
+
+def _bytes_check(check):
+    """Return a bytes equivalent of a datatype check, valid for ASCII fields."""
+    if check is str.isdigit:
+        return bytes.isdigit
+    pattern = getattr(check, '__self__', None)
+    # A bytes \s misses \x1c-\x1f, so patterns using it keep running on str
+    if isinstance(pattern, re.Pattern) and '\\s' not in pattern.pattern and '\\S' not in pattern.pattern:
+        return re.compile(pattern.pattern.encode(), pattern.flags & ~re.UNICODE).match
+    return lambda field: check(field.decode('utf-8'))
+
+def validate_records_fused(filename, delimiter='\t', expected_length=None, max_lengths=None,
+                           datatype_checks=None, mandatory_fields=None, id_index=None):
+    """Run the per-record checks in a single pass over the file.
+
+    Each line is read and split once; checks left as None are skipped. Like the
+    individual validators, every check reports only its first failure, except
+    duplicate detection which reports every repeated id.
+
+    The file is memory-mapped and lines are handled as bytes, so field byte lengths
+    come for free and lines are only decoded to build error messages or to run a
+    datatype check on a non-ASCII field. Lines end at \r\n, \r or \n, as they did
+    when the file was read in text mode.
+    """
+    length_error = field_length_error = datatype_error = mandatory_error = None
+    seen_ids = set()
+    add_id = seen_ids.add
+    duplicates = []
+    if os.path.getsize(filename) == 0:
+        return duplicates  # an empty file cannot be memory-mapped
+    sep = delimiter.encode('utf-8')
+    if datatype_checks is not None:
+        byte_checks = [_bytes_check(check) for check in datatype_checks]
+    # When only the leading id is needed, partition the line instead of splitting every field
+    ids_only = id_index == 0 and all(check is None for check in (
+        expected_length, max_lengths, datatype_checks, mandatory_fields))
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # readline only ends lines at \n, so files containing a \r go through the slower regex split
+        lines = iter(mm.readline, b'') if mm.find(b'\r') == -1 else (m.group() for m in _LINE.finditer(mm))
+        for i, line in enumerate(lines, start=1):
+            line = _strip(line)
+            if ids_only:
+                record_id = line.partition(sep)[0]
+                if record_id in seen_ids:
+                    duplicates.append(f"Duplicate record found at line {i}: {line.decode('utf-8')}")
+                else:
+                    add_id(record_id)
+                continue
+            fields = line.split(sep)
+
+            if expected_length is not None and length_error is None:
+                if len(fields) != expected_length:
+                    length_error = f"Record {i} has an incorrect number of fields. Expected {expected_length}, found {len(fields)}."
+
+            if max_lengths is not None and field_length_error is None:
+                for j, (field, max_length) in enumerate(zip(fields, max_lengths)):
+                    if len(field) > max_length:
+                        field_length_error = f"Record {i}, Field {j+1} exceeds the maximum length of {max_length} bytes."
+                        break
+
+            if datatype_checks is not None and datatype_error is None:
+                for j, (field, byte_check, check) in enumerate(zip(fields, byte_checks, datatype_checks)):
+                    if not (byte_check(field) if field.isascii() else check(field.decode('utf-8'))):
+                        datatype_error = f"Record {i}, Field {j+1} does not match the expected datatype."
+                        break
+
+            if mandatory_fields is not None and mandatory_error is None:
+                for field_index in mandatory_fields:
+                    if field_index >= len(fields) or not _strip(fields[field_index]):
+                        mandatory_error = f"Record {i}, Field {field_index+1} is mandatory and cannot be empty or contain only spaces."
+                        break
+
+            if id_index is not None:
+                record_id = fields[id_index]
+                if record_id in seen_ids:
+                    duplicates.append(f"Duplicate record found at line {i}: {line.decode('utf-8')}")
+                else:
+                    add_id(record_id)
+
+    errors = [e for e in (length_error, field_length_error, datatype_error, mandatory_error) if e]
+    return errors + duplicates
+
+def _vectorized_check(check, column):
+    """Apply a per-field datatype check to a whole column, returning a boolean Series."""
+    if check is str.isdigit:
+        return column.str.isdigit()
+    pattern = getattr(check, '__self__', None)
+    if isinstance(pattern, re.Pattern):
+        return column.str.match(pattern)
+    return column.map(lambda x: bool(check(x)))
+
+def _field_counts(raw, sep):
+    """Return the number of sep-delimited fields on each newline-terminated line of raw."""
+    buf = np.frombuffer(raw, dtype=np.uint8)
+    line_ends = np.flatnonzero(buf == ord('\n'))
+    if buf.size and buf[-1] != ord('\n'):
+        line_ends = np.append(line_ends, buf.size)
+    delimiters = np.flatnonzero(buf == sep[0])
+    return np.diff(np.searchsorted(delimiters, line_ends), prepend=0) + 1
+
+def validate_records_vectorized(filename, delimiter='\t', expected_length=None, max_lengths=None,
+                                datatype_checks=None, mandatory_fields=None, id_index=None):
+    """Run the per-record checks as column operations on a DataFrame.
+
+    Takes the same arguments and returns the same errors as validate_records_fused.
+    Files that do not parse into a clean table (ragged or blank records, lone carriage
+    returns, a byte order mark, NUL bytes, or a multi-character delimiter) are handed
+    to validate_records_fused so structural errors are reported line by line.
+    """
+    fallback = (filename, delimiter, expected_length, max_lengths, datatype_checks, mandatory_fields, id_index)
+    sep = delimiter.encode('utf-8')
+    if len(sep) != 1:
+        return validate_records_fused(*fallback)  # the C parser only splits on a single byte
+    with open(filename, 'rb') as file:
+        raw = file.read()
+    if raw.count(b'\r') != raw.count(b'\r\n'):
+        return validate_records_fused(*fallback)  # _field_counts only ends lines at \n
+    if raw.startswith(codecs.BOM_UTF8) or b'\x00' in raw:
+        # The C parser strips a leading BOM and cuts fields short at NUL, hiding both from the checks
+        return validate_records_fused(*fallback)
+
+    # dtype=object keeps Python str cells, so .str checks follow Python re semantics
+    # rather than those of a pyarrow-backed string dtype
+    try:
+        df = pd.read_csv(io.BytesIO(raw), sep=delimiter, header=None, dtype=object, na_filter=False,
+                         quoting=csv.QUOTE_NONE, skip_blank_lines=False, engine='c')
+    except (pd.errors.EmptyDataError, pd.errors.ParserError):
+        return validate_records_fused(*fallback)
+    # read_csv pads short and blank rows with '' instead of failing, so compare every
+    # line's own field count against the frame's width before trusting it
+    field_counts = _field_counts(raw, sep)
+    if len(field_counts) != len(df) or (field_counts != df.shape[1]).any():
+        return validate_records_fused(*fallback)
+    if expected_length is not None and df.shape[1] != expected_length:
+        return validate_records_fused(*fallback)
+    if delimiter.isspace():
+        # line.strip() in the streaming path would swallow a blank first or last field
+        if (df.iloc[:, 0].str.strip().eq('') | df.iloc[:, -1].str.strip().eq('')).any():
+            return validate_records_fused(*fallback)
+
+    # Match the line.strip() applied by the streaming path
+    df.iloc[:, 0] = df.iloc[:, 0].str.lstrip()
+    df.iloc[:, -1] = df.iloc[:, -1].str.rstrip()
+    n_fields = df.shape[1]
+    errors = []
+
+    if max_lengths:
+        k = min(n_fields, len(max_lengths))
+        bad = np.column_stack([_exceeds_utf8_length(df.iloc[:, j], max_lengths[j]) for j in range(k)])
+        rows = np.flatnonzero(bad.any(axis=1))
+        if rows.size:
+            i = rows[0]
+            j = int(np.argmax(bad[i]))
+            errors.append(f"Record {i+1}, Field {j+1} exceeds the maximum length of {max_lengths[j]} bytes.")
+
+    if datatype_checks:
+        k = min(n_fields, len(datatype_checks))
+        bad = np.column_stack([~_vectorized_check(datatype_checks[j], df.iloc[:, j]).to_numpy(dtype=bool)
+                               for j in range(k)])
+        rows = np.flatnonzero(bad.any(axis=1))
+        if rows.size:
+            i = rows[0]
+            j = int(np.argmax(bad[i]))
+            errors.append(f"Record {i+1}, Field {j+1} does not match the expected datatype.")
+
+    if mandatory_fields:
+        bad = np.column_stack([df.iloc[:, idx].str.strip().eq('').to_numpy(dtype=bool) if idx < n_fields
+                               else np.ones(len(df), dtype=bool) for idx in mandatory_fields])
+        rows = np.flatnonzero(bad.any(axis=1))
+        if rows.size:
+            i = rows[0]
+            field_index = mandatory_fields[int(np.argmax(bad[i]))]
+            errors.append(f"Record {i+1}, Field {field_index+1} is mandatory and cannot be empty or contain only spaces.")
+
+    if id_index is not None:
+        dup_mask = df.iloc[:, id_index].duplicated(keep='first').to_numpy()
+        dup_lines = np.flatnonzero(dup_mask) + 1
+        errors.extend(f"Duplicate record found at line {ln}: {delimiter.join(record)}"
+                      for ln, record in zip(dup_lines, df[dup_mask].itertuples(index=False)))
+
+    return errors
+
 def validate_record_length(filename, expected_length, delimiter='\t'):
     """Validate that each record has the expected number of fields."""
-    with open(filename, 'r') as file:
-        for i, line in enumerate(file, start=1):
-            fields = line.strip().split(delimiter)
-            if len(fields) != expected_length:
-                return f"Record {i} has an incorrect number of fields. Expected {expected_length}, found {len(fields)}."
-    return None
+    errors = validate_records_fused(filename, delimiter, expected_length=expected_length)
+    return errors[0] if errors else None
 
 def validate_field_lengths(filename, max_lengths, delimiter='\t'):
     """Validate that each field in the records does not exceed its maximum length."""
-    with open(filename, 'r') as file:
-        for i, line in enumerate(file, start=1):
-            fields = line.strip().split(delimiter)
-            for j, field in enumerate(fields):
-                if len(field.encode('utf-8')) > max_lengths[j]:
-                    return f"Record {i}, Field {j+1} exceeds the maximum length of {max_lengths[j]} bytes."
-    return None
+    errors = validate_records_fused(filename, delimiter, max_lengths=max_lengths)
+    return errors[0] if errors else None
 
 def validate_datatypes(filename, datatype_checks, delimiter='\t'):
     """Validate that each field in the records matches the expected datatype."""
-    with open(filename, 'r') as file:
-        for i, line in enumerate(file, start=1):
-            fields = line.strip().split(delimiter)
-            for j, field in enumerate(fields):
-                if not datatype_checks[j](field):
-                    return f"Record {i}, Field {j+1} does not match the expected datatype."
-    return None
+    errors = validate_records_fused(filename, delimiter, datatype_checks=datatype_checks)
+    return errors[0] if errors else None
 
 def validate_mandatory_fields(filename, mandatory_fields, delimiter='\t'):
     """Validate that mandatory fields are not null, empty, or contain only spaces."""
-    with open(filename, 'r') as file:
-        for i, line in enumerate(file, start=1):
-            fields = line.strip().split(delimiter)
-            for field_index in mandatory_fields:
-                if not fields[field_index].strip():
-                    return f"Record {i}, Field {field_index+1} is mandatory and cannot be empty or contain only spaces."
-    return None
+    errors = validate_records_fused(filename, delimiter, mandatory_fields=mandatory_fields)
+    return errors[0] if errors else None
 
 def check_for_duplicates(filename, delimiter='\t'):
     """Check for duplicate records based on the 'member id' field."""
-    seen_ids = set()
-    duplicates = []
-    with open(filename, 'r') as file:
-        for i, line in enumerate(file, start=1):
-            fields = line.strip().split(delimiter)
-            record_id = fields[0]  # Assuming 'member id' is the first field
-            if record_id in seen_ids:
-                duplicates.append(f"Duplicate record found at line {i}: {line.strip()}")
-            else:
-                seen_ids.add(record_id)
-    return duplicates
-
-def run_all_validations(filename, delimiter='\t', expected_encoding='utf-8'):
-    """Run all validations on the file and return a list of errors."""
+    return validate_records_fused(filename, delimiter, id_index=0)  # Assuming 'member id' is the first field
+
+def run_all_validations(filename, delimiter='\t', expected_encoding='utf-8', streaming=False):
+    """Run all validations on the file and return a list of errors.
+
+    Records are validated column-wise on a DataFrame; pass streaming=True to check
+    them line by line instead, for files too large to load into memory.
+    """
     errors = []
 
     # Check encoding and convert if necessary
-    encoding_error = validate_encoding(filename, expected_encoding)
-    if encoding_error:
-        errors.append(encoding_error)
-        temp_filename = 'temp_converted_file.txt'
-        try:
-            convert_to_utf8(filename, temp_filename)
-            filename = temp_filename  # Update filename to the converted file
-        except RuntimeError as e:
-            errors.append(str(e))
-            return errors
+    temp_filename = 'temp_converted_file.txt'
+    encoding_errors, filename = validate_and_convert_encoding(filename, temp_filename, expected_encoding)
+    errors.extend(encoding_errors)
+    if filename is None:
+        return errors
 
     # Run each validation function
     result = validate_filename(filename)
@@ -102,37 +312,34 @@ def run_all_validations(filename, delimiter='\t', expected_encoding='utf-8'):
     result = validate_file_size(filename)
     if result: errors.append(result)
 
-    result = validate_record_length(filename, expected_length=11, delimiter=delimiter)
-    if result: errors.append(result)
-
     max_lengths = [9, 3, 3, 9, 9, 9, 8, 10, 10, 10, 525]  # Max lengths for each field
-    result = validate_field_lengths(filename, max_lengths, delimiter)
-    if result: errors.append(result)
-
     datatype_checks = [
-        lambda x: bool(re.match(r'^[a-zA-Z0-9\-]+$', x)),  # member id: alphanumeric
-        lambda x: x.isdigit(),  # member cd: numeric
-        lambda x: bool(re.match(r'^[a-zA-Z0-9\-]+$', x)),  # SPI Type cd: alphanumeric
-        lambda x: x.isdigit(),  # LL eff dte: numeric
-        lambda x: x.isdigit(),  # LL end dte: numeric
-        lambda x: x.isdigit(),  # process date: numeric
-        lambda x: bool(re.match(r'^[a-zA-Z0-9\-]+$', x)),  # process id: alphanumeric
-        lambda x: bool(re.match(r'^[a-zA-Z0-9\-]+$', x)),  # npi id: alphanumeric
-        lambda x: bool(re.match(r'^[a-zA-Z0-9\-]+$', x)),  # dignss cd: alphanumeric
-        lambda x: bool(re.match(r'^[a-zA-Z0-9\-]+$', x)),  # tdignss cd: alphanumeric
-        lambda x: bool(re.match(r'^[\w\s\-]+$', x))  # txt line: alphanumeric (with spaces and hyphens)
+        _ALNUM,  # member id: alphanumeric
+        str.isdigit,  # member cd: numeric
+        _ALNUM,  # SPI Type cd: alphanumeric
+        str.isdigit,  # LL eff dte: numeric
+        str.isdigit,  # LL end dte: numeric
+        str.isdigit,  # process date: numeric
+        _ALNUM,  # process id: alphanumeric
+        _ALNUM,  # npi id: alphanumeric
+        _ALNUM,  # dignss cd: alphanumeric
+        _ALNUM,  # tdignss cd: alphanumeric
+        _TXT  # txt line: alphanumeric (with spaces and hyphens)
     ]
-    result = validate_datatypes(filename, datatype_checks, delimiter)
-    if result: errors.append(result)
-
     # Check mandatory fields: 'member id' (index 0), 'member cd' (index 1), 'SPI Type cd' (index 2),
     # 'LL eff dte' (index 3), 'LL end dte' (index 4), 'process date' (index 5)
     mandatory_fields = [0, 1, 2, 3, 4, 5]
-    result = validate_mandatory_fields(filename, mandatory_fields, delimiter)
-    if result: errors.append(result)
 
-    duplicates = check_for_duplicates(filename, delimiter)
-    if duplicates: errors.extend(duplicates)
+    # Record length, field lengths, datatypes, mandatory fields and duplicates
+    validate_records = validate_records_fused if streaming else validate_records_vectorized
+    errors.extend(validate_records(
+        filename, delimiter,
+        expected_length=11,
+        max_lengths=max_lengths,
+        datatype_checks=datatype_checks,
+        mandatory_fields=mandatory_fields,
+        id_index=0,
+    ))
 
     return errors
 
@@ -142,9 +349,7 @@ def generate_report(errors, report_file):
         if not errors:
             file.write("File validation successful. No errors found.\n")
         else:
-            file.write("File validation failed. Errors:\n")
-            for error in errors:
-                file.write(f"{error}\n")
+            file.write("File validation failed. Errors:\n" + "\n".join(errors) + "\n")
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import codecs
+import random
+
+import pytest
+
+from file_validation import (_ALNUM, _TXT, validate_and_convert_encoding, validate_records_fused,
+                             validate_records_vectorized)
+
+CHECKS = dict(expected_length=3, max_lengths=[9, 3, 20], datatype_checks=[_ALNUM, str.isdigit, _ALNUM],
+              mandatory_fields=[0, 1], id_index=0)
+
+@pytest.mark.parametrize('raw, expected', [
+    (codecs.BOM_UTF8 + b'AB123\t001\thello\n', "Record 1, Field 1 does not match the expected datatype."),
+    (b'AB123\t0\x001\thello\n', "Record 1, Field 2 does not match the expected datatype."),
+])
+def test_vectorized_matches_fused_on_bom_and_nul(tmp_path, raw, expected):
+    path = tmp_path / 'records.txt'
+    path.write_bytes(raw)
+    fused = validate_records_fused(str(path), **CHECKS)
+    assert expected in fused
+    assert validate_records_vectorized(str(path), **CHECKS) == fused
+
+def test_lone_carriage_returns_end_lines(tmp_path):
+    path = tmp_path / 'records.txt'
+    path.write_bytes(b'AB1\t001\tx\rAB1\t002\ty\r')
+    expected = ["Duplicate record found at line 2: AB1\t002\ty"]
+    assert validate_records_fused(str(path), **CHECKS) == expected
+    assert validate_records_vectorized(str(path), **CHECKS) == expected
+
+@pytest.mark.parametrize('raw, delimiter', [
+    (b'AB1\t001\tx\nAB2\t002\n', '\t'),  # short row
+    (b'AB1\t001\tx\nAB2\t002\ty\tz\n', '\t'),  # long row
+    (b'AB1\t001\tx\n\nAB2\t002\ty\n', '\t'),  # blank row
+    (b'AB1\t001\tx\nAB1\t002\ty\n\n', '\t'),  # trailing blank row
+    (b'AB1\t001\tx\r\nAB1\t002\ty\r\n', '\t'),  # CRLF
+    (b'AB1|001|x\r\nAB2|0a2|y', '|'),
+    (b'AB1 001 x\n 002 y\n', ' '),  # blank first field with a whitespace delimiter
+    (b'AB1 001 x\nAB2 002 \n', ' '),  # blank last field with a whitespace delimiter
+    ('AB1\t\xa0\tx\n'.encode(), '\t'),  # NBSP-only mandatory field
+    ('\xa0AB1\t001\tx\xa0\n'.encode(), '\t'),  # NBSP around the line
+    (b'AB1\t\x1c\tx\n\x1fAB2\t002\ty\x1d\n', '\t'),  # \x1c-\x1f are str whitespace
+    (b'AB1::001::x\nAB1::002::y\n', '::'),  # multi-character delimiter
+])
+def test_vectorized_matches_fused(tmp_path, raw, delimiter):
+    path = tmp_path / 'records.txt'
+    path.write_bytes(raw)
+    assert validate_records_vectorized(str(path), delimiter, **CHECKS) == \
+        validate_records_fused(str(path), delimiter, **CHECKS)
+
+def test_vectorized_matches_fused_randomized(tmp_path):
+    checks = dict(CHECKS, max_lengths=[4, 3, 6], datatype_checks=[_ALNUM, str.isdigit, _TXT])
+    rng = random.Random(0)
+    odd = ['-', ' ', '\xa0', '\x1c', '\x1f', '\x00', '\xe9', '\u3000', '\r']
+
+    def field():
+        return ''.join(rng.choice(odd) if rng.random() < 0.3 else rng.choice('ab12')
+                       for _ in range(rng.randrange(5)))
+
+    path = tmp_path / 'records.txt'
+    for _ in range(500):
+        delimiter = rng.choice(['\t', '|', ' ', '::'])
+        lines = [delimiter.join(field() for _ in range(3 if rng.random() < 0.9 else rng.randrange(1, 5)))
+                 for _ in range(rng.randrange(1, 5))]
+        eol = rng.choice(['\n', '\r\n'])
+        text = eol.join(lines) + (eol if rng.random() < 0.5 else '')
+        if rng.random() < 0.05:
+            text = '\ufeff' + text
+        path.write_bytes(text.encode('utf-8'))
+        assert validate_records_vectorized(str(path), delimiter, **checks) == \
+            validate_records_fused(str(path), delimiter, **checks), repr(text)
+
+def test_failed_conversion_keeps_encoding_error(tmp_path):
+    path = tmp_path / 'records.txt'
+    path.write_bytes(b'AB1\t001\tcaf\xe9\n')
+    errors, converted = validate_and_convert_encoding(str(path), str(tmp_path / 'missing' / 'out.txt'))
+    assert converted is None
+    assert errors[0] == f"File '{path}' is not encoded in utf-8."
+    assert errors[1].startswith("Failed to convert file encoding:")